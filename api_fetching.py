@@ -2,24 +2,35 @@
 """
 Handles fetching data from external APIs as specified in Comparison Rule Templates.
 
-Core Function:
+Core Functions:
 - fetch_and_process_api_data_for_entity: Fetches data from a rule-specific API URL,
                                          filters items based on the rule's identifier,
                                          processes the response into a comparable format,
                                          and determines the maximum numeric ID from that response.
+- fetch_api_data_for_entities: Runs several entity fetches concurrently, returning results
+                               in the order they were requested.
+- clear_api_response_cache: Empties the optional in-memory cache of parsed API responses.
 """
 
 import logging
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import re # For normalizing expressions if needed
 import json # For handling potential JSON decode errors
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import orjson # Optional C JSON parser; not part of the offline wheelhouse
+except ImportError:
+    orjson = None
 from typing import Dict, Any, Tuple, Optional, List
 
-# Import the shared identifier matching logic from utils.py
+# Import the shared identifier matching and expression normalization helpers from utils.py
 try:
-    from utils import match_identifier_logic
+    from utils import match_identifier_logic, normalize_skill_expression
 except ImportError:
-    logging.error("Failed to import match_identifier_logic from utils.py in api_fetching.py")
+    logging.error("Failed to import match_identifier_logic/normalize_skill_expression from utils.py in api_fetching.py")
     # Define a dummy function if utils.py or the function is missing, to allow startup
     def match_identifier_logic(value_to_check_str: str, identifier_rule: Dict[str, Any]) -> bool:
         """Dummy identifier matching function if import fails."""
@@ -28,8 +39,40 @@ except ImportError:
         # False is safer if the logic is critical for filtering.
         return False
 
+    def normalize_skill_expression(expression: str) -> str:
+        """Dummy normalization function if import fails; returns the expression unchanged."""
+        logging.error("Dummy normalize_skill_expression called. Real function not imported from utils.py.")
+        return expression
+
 logger = logging.getLogger(__name__) # Use module-specific logger
 
+# --- Shared HTTP Session ---
+# One pooled session for all entity fetches, so repeated calls to the same API host
+# reuse kept-alive connections instead of opening a new TCP/TLS connection per URL.
+# A failed connection is retried once. read=False disables read retries outright, so a slow
+# API isn't re-requested and its timeout surfaces as requests' ReadTimeout (read=0 would
+# instead wrap it in MaxRetryError, reported as a ConnectionError). 'api_timeout' bounds each
+# connect attempt and the read separately, so a fetch is held at most two connect timeouts
+# plus one read timeout.
+API_RETRY_POLICY = Retry(total=1, connect=1, read=False, backoff_factor=0.3)
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=API_RETRY_POLICY))
+_SESSION.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=API_RETRY_POLICY))
+# Upper bound on entity API fetches run at the same time (kept within the session's pool size)
+API_FETCH_MAX_WORKERS = 4
+
+# --- API Response Cache ---
+# Parsed API responses keyed by URL, stamped with time.monotonic() when fetched.
+# Only used when 'api_cache_ttl_seconds' > 0 (off by default), so back-to-back uploads run
+# through /run-comparison can skip the network round-trip and JSON parse. Saving settings or
+# a rule template clears it, and re-compare always clears it to check against live data.
+_API_RESPONSE_CACHE: Dict[str, Tuple[float, List[Any]]] = {}
+
+
+def clear_api_response_cache():
+    """Drops all cached API responses so the next fetch goes to the API."""
+    _API_RESPONSE_CACHE.clear()
+
 
 # The function fetch_max_ids_from_config_urls has been REMOVED.
 # Max ID calculation for the *overall system state* (to be written to Metadata sheet)
@@ -74,16 +117,27 @@ def fetch_and_process_api_data_for_entity(
         logger.warning(f"No API URL provided for entity '{entity_name}'. Skipping API fetch for comparison.")
         return processed_api_data, max_id_from_this_api
 
-    try:
-        response = requests.get(api_url, timeout=timeout)
-        response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-        raw_api_response_list = response.json() # Assuming API returns a list of items
+    cache_ttl = app_config.get('api_cache_ttl_seconds', 0)
+    cached_entry = _API_RESPONSE_CACHE.get(api_url) if cache_ttl > 0 else None
 
-        # Ensure the API response is a list
-        if not isinstance(raw_api_response_list, list):
-            logger.error(f"API response for '{entity_name}' from {api_url} is not a list. Response type: {type(raw_api_response_list)}. Response: {raw_api_response_list}")
-            return processed_api_data, max_id_from_this_api
-        logging.info(f"Successfully fetched {len(raw_api_response_list)} raw items for entity '{entity_name}' from {api_url}.")
+    try:
+        if cached_entry is not None and time.monotonic() - cached_entry[0] < cache_ttl:
+            raw_api_response_list = cached_entry[1]
+            logger.info(f"Using cached API response ({len(raw_api_response_list)} raw items) for entity '{entity_name}' from {api_url}.")
+        else:
+            response = _SESSION.get(api_url, timeout=timeout) # Pooled keep-alive session
+            response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
+            # Assuming API returns a list of items. orjson parses the raw bytes directly when available;
+            # its JSONDecodeError subclasses json.JSONDecodeError, so the handler below covers both.
+            raw_api_response_list = orjson.loads(response.content) if orjson is not None else response.json()
+
+            # Ensure the API response is a list
+            if not isinstance(raw_api_response_list, list):
+                logger.error(f"API response for '{entity_name}' from {api_url} is not a list. Response type: {type(raw_api_response_list)}. Response: {raw_api_response_list}")
+                return processed_api_data, max_id_from_this_api
+            logging.info(f"Successfully fetched {len(raw_api_response_list)} raw items for entity '{entity_name}' from {api_url}.")
+            if cache_ttl > 0:
+                _API_RESPONSE_CACHE[api_url] = (time.monotonic(), raw_api_response_list)
 
         # Get processing hints from the rule, with defaults
         # These hints guide how to extract key fields from the API response items.
@@ -116,6 +170,10 @@ def fetch_and_process_api_data_for_entity(
             api_identifier_source_field = hints.get("apiIdentifierField", expression_field_in_api)
 
 
+        # Checked once: the per-item debug messages below embed whole item dicts, and building
+        # them for every filtered-out item is wasted work when debug logging is off.
+        debug_logging_enabled = logger.isEnabledFor(logging.DEBUG)
+
         # Process each item received from the API
         for api_item in raw_api_response_list:
             # Handle responses where data might be nested under a 'data' key, or be the item itself
@@ -127,13 +185,15 @@ def fetch_and_process_api_data_for_entity(
             # --- Filter API item based on the rule's identifier ---
             value_to_match_in_api = item_data.get(api_identifier_source_field)
             if value_to_match_in_api is None:
-                logger.debug(f"API item for '{entity_name}' missing identifier source field '{api_identifier_source_field}'. Skipping. Item: {item_data}")
+                if debug_logging_enabled:
+                    logger.debug(f"API item for '{entity_name}' missing identifier source field '{api_identifier_source_field}'. Skipping. Item: {item_data}")
                 continue
 
             # Use the shared match_identifier_logic from utils.py
             # The entity_identifier_rule is the 'identifier' object from the comparison_rule_template.json
             if not match_identifier_logic(str(value_to_match_in_api), entity_identifier_rule):
-                logger.debug(f"API item for '{entity_name}' did not match rule identifier. Value checked: '{value_to_match_in_api}'. Rule: {entity_identifier_rule}. Item: {item_data}")
+                if debug_logging_enabled:
+                    logger.debug(f"API item for '{entity_name}' did not match rule identifier. Value checked: '{value_to_match_in_api}'. Rule: {entity_identifier_rule}. Item: {item_data}")
                 continue
             # --- End API Item Filtering ---
 
@@ -159,8 +219,8 @@ def fetch_and_process_api_data_for_entity(
                 ideal_val = item_data.get(ideal_field_in_api, "") or ""
 
                 # Normalize and create a key similar to how it's done by ExcelRuleEngine
-                norm_expr = expr_val.replace(" ", "").replace('\u00A0', '').replace("|", " | ").replace("&", " & ")
-                norm_ideal = ideal_val.replace(" ", "").replace('\u00A0', '').replace("|", " | ").replace("&", " & ")
+                norm_expr = normalize_skill_expression(expr_val)
+                norm_ideal = normalize_skill_expression(ideal_val) if ideal_val else "" # Most items have no ideal part
 
                 # The comparison key for skill expressions is usually combined
                 api_item_key_for_dict = norm_expr # Default key
@@ -207,3 +267,33 @@ def fetch_and_process_api_data_for_entity(
 
     return processed_api_data, max_id_from_this_api
 
+
+# --- Function to Fetch Several Entity Rules Concurrently ---
+def fetch_api_data_for_entities(
+    fetch_jobs: List[Tuple[str, str, Dict[str, Any]]],
+    app_config: Dict[str, Any]
+) -> List[Tuple[Dict[str, Any], int]]:
+    """
+    Runs fetch_and_process_api_data_for_entity for several entity rules at once.
+    The fetches are independent network round-trips, so total time is roughly that
+    of the slowest call rather than the sum of all of them.
+
+    Args:
+        fetch_jobs: List of (api_url, entity_name, comparison_rule_entity_definition) tuples.
+        app_config: The global application configuration (for 'api_timeout').
+
+    Returns:
+        A list of (processed_api_data, max_id_from_this_api) tuples, in the same order
+        as fetch_jobs. Failed fetches yield ({}, 0), as with the single-entity function.
+    """
+    if len(fetch_jobs) <= 1: # Nothing to overlap; skip the thread pool
+        return [fetch_and_process_api_data_for_entity(api_url, entity_name, rule, app_config)
+                for api_url, entity_name, rule in fetch_jobs]
+
+    with ThreadPoolExecutor(max_workers=min(API_FETCH_MAX_WORKERS, len(fetch_jobs))) as executor:
+        futures = [
+            executor.submit(fetch_and_process_api_data_for_entity, api_url, entity_name, rule, app_config)
+            for api_url, entity_name, rule in fetch_jobs
+        ]
+        # fetch_and_process_api_data_for_entity handles its own errors, so result() doesn't raise
+        return [future.result() for future in futures]
@@ -16,7 +16,7 @@ from flask import Flask, redirect, url_for, flash # Import flash for potential u
 
 # Import configuration loading function from config.py
 try:
-    from config import load_config, save_config
+    from config import load_config, save_config, ensure_default_config
 except ImportError as e:
     print(f"ERROR: Failed to import from config.py: {e}. Ensure config.py exists in the same directory.")
     sys.exit(1)
@@ -76,6 +76,12 @@ def create_app():
         logger.warning("Using default development secret key. SET FLASK_SECRET_KEY environment variable for production!")
 
     # --- Load Application Configuration ---
+    # Create a default config.ini on first start so there's a file to edit.
+    # Failing to write it (e.g. read-only install) isn't fatal; load_config falls back to the built-in defaults.
+    try:
+        ensure_default_config(CONFIG_FILE)
+    except FileNotFoundError as e:
+        logger.warning(f"{e} Continuing with built-in defaults.")
     try:
         app_config = load_config(CONFIG_FILE)
         app.config['APP_SETTINGS'] = app_config
@@ -18,6 +18,15 @@ from flask import (
 )
 from typing import Dict, Any, Optional, List
 
+# Saved rule templates change which API URLs are compared against, so cached API responses are dropped on save
+try:
+    from api_fetching import clear_api_response_cache
+except ImportError:
+    logging.error("Failed to import clear_api_response_cache from api_fetching.py in excel_rule_routes.py")
+    def clear_api_response_cache():
+        """Dummy cache clear if the import fails."""
+        pass
+
 # --- Constants ---
 # Directory where Excel processing rule templates are stored
 EXCEL_RULE_TEMPLATE_DIR = './excel_rule_templates/' # Ensure this matches the directory created
@@ -186,6 +195,7 @@ def save_excel_rule_template():
         # Write the JSON content to the file, pretty-printed with indent=2
         with open(filepath, 'w', encoding='utf-8') as f:
             json.dump(content, f, indent=2)
+        clear_api_response_cache()
 
         logger.info(f"{action} Excel rule template file: {filepath}")
         # Return success message with appropriate HTTP status code
@@ -12,13 +12,16 @@ import json
 import logging
 import re
 import shutil
+import tempfile
 import openpyxl
 import datetime # For timestamped filenames
+from concurrent.futures import ThreadPoolExecutor
 from flask import (
     Blueprint, request, jsonify, current_app, abort, flash, redirect, url_for
 )
 from werkzeug.utils import secure_filename
 from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
 from typing import Dict, Any, Optional, Tuple, Set, List
 
 # Import utility functions and constants
@@ -41,7 +44,7 @@ except ImportError as e:
 try:
     from config import save_config
     from excel_processing import parse_source_excel_to_standardized_workbook as built_in_parse_source_excel
-    from api_fetching import fetch_and_process_api_data_for_entity
+    from api_fetching import fetch_api_data_for_entities, clear_api_response_cache
     from comparison_logic import write_comparison_sheets
     METADATA_SHEET_NAME = "Metadata"
     MAX_DN_ID_LABEL_CELL = "A1"; MAX_DN_ID_VALUE_CELL = "B1"
@@ -54,8 +57,9 @@ try:
 except ImportError as e:
      logging.critical(f"CRITICAL: Failed to import core processing functions: {e}. Processing endpoints will fail.", exc_info=True)
      def save_config(p, s): raise NotImplementedError("save_config not imported")
-     def built_in_parse_source_excel(wb, cfg): raise NotImplementedError("built_in_parse_source_excel not imported")
-     def fetch_and_process_api_data_for_entity(u, en, r, c): return ({}, 0)
+     def built_in_parse_source_excel(wb): raise NotImplementedError("built_in_parse_source_excel not imported")
+     def fetch_api_data_for_entities(jobs, c): return [({}, 0) for _ in jobs]
+     def clear_api_response_cache(): pass
      def write_comparison_sheets(w, s, a, i): raise NotImplementedError("write_comparison_sheets not imported")
      METADATA_SHEET_NAME = "Metadata"; MAX_DN_ID_LABEL_CELL = "A1"; MAX_DN_ID_VALUE_CELL = "B1"; MAX_AG_ID_LABEL_CELL = "A2"; MAX_AG_ID_VALUE_CELL = "B2"
      DN_SHEETS = set(); AGENT_GROUP_SHEETS = set()
@@ -76,6 +80,29 @@ def allowed_file(filename: str) -> bool:
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def save_workbook_atomically(workbook: openpyxl.Workbook, filepath: str):
+    """
+    Saves the workbook to a temporary file next to filepath, then moves it into place.
+    A failed or interrupted save leaves any existing file at filepath untouched
+    (re-compare overwrites the processed file it was loaded from).
+    The temp file gets a unique name, so concurrent saves of the same file don't share it.
+    """
+    temp_fd, temp_filepath = tempfile.mkstemp(
+        dir=os.path.dirname(filepath) or '.', prefix=os.path.basename(filepath) + '.', suffix='.tmp.xlsx'
+    )
+    os.close(temp_fd) # openpyxl opens the path itself
+    try:
+        if os.path.exists(filepath):
+            shutil.copymode(filepath, temp_filepath) # mkstemp creates the file owner-only
+        workbook.save(temp_filepath)
+        os.replace(temp_filepath, filepath)
+    except Exception:
+        if os.path.exists(temp_filepath):
+            try: os.remove(temp_filepath)
+            except OSError as rm_err: logger.warning(f"Could not remove partial save file {temp_filepath}: {rm_err}")
+        raise
+
+
 # --- API Routes ---
 
 @processing_bp.route('/upload-original-file', methods=['POST'])
@@ -196,10 +223,24 @@ def run_comparison():
             return jsonify({"error": f"Could not load/parse Excel rule template: {e}"}), 500
 
     output_workbook = None
+    api_fetch_executor = None
+    api_fetch_future = None
     try:
-        source_workbook = openpyxl.load_workbook(original_filepath, read_only=False, data_only=False)
-        parsed_workbook_object = built_in_parse_source_excel(source_workbook, app_config_settings)
-        source_workbook.close()
+        # The API fetches depend only on the rule template, not on the parsed workbook, so start them
+        # in the background now and let the network round-trips overlap with parsing the source file.
+        if perform_comparison and rule_template_json and "Entities" in rule_template_json:
+            enabled_entity_rules = [rule for rule in rule_template_json["Entities"] if rule.get("enabled", True)]
+            api_fetch_jobs = [(rule["comparisonApiUrl"], rule["name"], rule) for rule in enabled_entity_rules if rule.get("comparisonApiUrl")]
+            api_fetch_executor = ThreadPoolExecutor(max_workers=1)
+            api_fetch_future = api_fetch_executor.submit(fetch_api_data_for_entities, api_fetch_jobs, app_config_settings)
+
+        # The source is only scanned by the parser, so stream it in read-only mode
+        # (cell styles, needed for strike-through detection, are still available)
+        source_workbook = openpyxl.load_workbook(original_filepath, read_only=True, data_only=False)
+        try:
+            parsed_workbook_object = built_in_parse_source_excel(source_workbook)
+        finally:
+            source_workbook.close() # Read-only workbooks keep the file open until closed
         logger.info(f"Built-in parser finished processing '{original_filename}'.")
         output_workbook = parsed_workbook_object
 
@@ -209,16 +250,15 @@ def run_comparison():
         if perform_comparison:
             logger.info("Proceeding with API comparison.")
             api_data_for_comparison = {}
-            if rule_template_json and "Entities" in rule_template_json:
-                for entity_rule in rule_template_json["Entities"]:
-                    if not entity_rule.get("enabled", True): continue
+            if api_fetch_future is not None:
+                # Wait for the background fetches started before parsing; results come back in rule order
+                api_fetch_results = iter(api_fetch_future.result())
+                for entity_rule in enabled_entity_rules:
                     entity_name = entity_rule["name"]
                     api_url = entity_rule.get("comparisonApiUrl")
                     id_pool_type = entity_rule.get("idPoolType")
                     if api_url:
-                        processed_data, max_id_this_api = fetch_and_process_api_data_for_entity(
-                            api_url, entity_name, entity_rule, app_config_settings
-                        )
+                        processed_data, max_id_this_api = next(api_fetch_results)
                         api_data_for_comparison[entity_name] = processed_data
                         if id_pool_type == 'dn': overall_max_dn_id = max(overall_max_dn_id, max_id_this_api)
                         elif id_pool_type == 'agent_group': overall_max_ag_id = max(overall_max_ag_id, max_id_this_api)
@@ -253,8 +293,10 @@ def run_comparison():
 
                 temp_sheet_data_for_comp[sheet_name_in_parsed_wb] = set()
                 temp_intermediate_data[sheet_name_in_parsed_wb] = {}
-                for row_cells in sheet_obj.iter_rows(min_row=2, values_only=False): # Get cell objects for style
-                    row_data = {headers[i]: cell.value for i, cell in enumerate(row_cells) if i < len(headers)}
+                # Only values and the primary key coordinate are needed, so skip building Cell objects
+                pk_col_letter = get_column_letter(headers.index(pk_col_excel_for_entity) + 1)
+                for row_idx, row_values in enumerate(sheet_obj.iter_rows(min_row=2, values_only=True), start=2):
+                    row_data = {headers[i]: value for i, value in enumerate(row_values) if i < len(headers)}
                     item_key = str(row_data.get(pk_col_excel_for_entity, ''))
                     if not item_key: continue
                     
@@ -268,12 +310,14 @@ def run_comparison():
                     current_item_details['_source_sheet_title_'] = sheet_name_in_parsed_wb
                     # The actual coordinate is from the parsed sheet, not the *very original* Excel.
                     # If styling is needed, it should be applied by the built-in parser.
-                    current_item_details['_source_cell_coordinate_'] = row_cells[headers.index(pk_col_excel_for_entity)].coordinate if pk_col_excel_for_entity in headers else "N/A"
+                    current_item_details['_source_cell_coordinate_'] = f"{pk_col_letter}{row_idx}"
                     temp_intermediate_data[sheet_name_in_parsed_wb][item_key] = current_item_details
 
             write_comparison_sheets(
                 output_workbook, temp_sheet_data_for_comp, api_data_for_comparison, temp_intermediate_data
             )
+            # The per-row detail dicts are no longer needed; release them before the save builds its XML
+            del temp_sheet_data_for_comp, temp_intermediate_data, api_data_for_comparison
 
             # Write Metadata sheet with aggregated Max IDs
             if METADATA_SHEET_NAME in output_workbook.sheetnames: del output_workbook[METADATA_SHEET_NAME]
@@ -285,7 +329,7 @@ def run_comparison():
             logging.info(f"Wrote Aggregated Max IDs (DN:{overall_max_dn_id}, AG:{overall_max_ag_id}) to '{METADATA_SHEET_NAME}'.")
 
         # Save the final workbook (either just parsed or parsed+compared)
-        output_workbook.save(processed_filepath)
+        save_workbook_atomically(output_workbook, processed_filepath)
         logger.info(f"Successfully saved final processed workbook to: {processed_filepath}")
 
         if perform_comparison:
@@ -312,6 +356,9 @@ def run_comparison():
         logger.error(f"Error during 'run_comparison' for '{original_filename}': {proc_err}", exc_info=True)
         return jsonify({"error": f"Error processing file '{original_filename}': {proc_err}"}), 500
     finally:
+        if api_fetch_executor is not None:
+            # Don't block the response on fetches still running after a parse failure; they end on their own timeouts
+            api_fetch_executor.shutdown(wait=False)
         if output_workbook:
             try: output_workbook.close()
             except Exception as close_e: logger.warning(f"Error closing output workbook: {close_e}")
@@ -421,30 +468,41 @@ def load_processed_file():
 
         api_data_for_comparison = {}; overall_max_dn_id_recomp = 0; overall_max_ag_id_recomp = 0
         if rule_template_json and "Entities" in rule_template_json:
-            for entity_rule in rule_template_json["Entities"]:
-                if not entity_rule.get("enabled", True): continue
+            enabled_entity_rules = [rule for rule in rule_template_json["Entities"] if rule.get("enabled", True)]
+            # Re-compare exists to check against the live API data, so never reuse cached responses here
+            clear_api_response_cache()
+            # Fetch all rule APIs concurrently up front; results come back in rule order
+            api_fetch_results = iter(fetch_api_data_for_entities(
+                [(rule["comparisonApiUrl"], rule["name"], rule) for rule in enabled_entity_rules if rule.get("comparisonApiUrl")],
+                app_config_settings
+            ))
+            for entity_rule in enabled_entity_rules:
                 entity_name = entity_rule["name"]; api_url = entity_rule.get("comparisonApiUrl"); id_pool = entity_rule.get("idPoolType")
                 if api_url:
-                    processed_data, max_id_api = fetch_and_process_api_data_for_entity(api_url, entity_name, entity_rule, app_config_settings)
+                    processed_data, max_id_api = next(api_fetch_results)
                     api_data_for_comparison[entity_name] = processed_data
                     if id_pool == 'dn': overall_max_dn_id_recomp = max(overall_max_dn_id_recomp, max_id_api)
                     elif id_pool == 'agent_group': overall_max_ag_id_recomp = max(overall_max_ag_id_recomp, max_id_api)
         logger.info(f"Re-compare Max IDs: DN={overall_max_dn_id_recomp}, AG={overall_max_ag_id_recomp}")
 
         output_workbook = openpyxl.load_workbook(processed_filepath, read_only=False, data_only=False)
-        for entity_name_to_clear in api_data_for_comparison.keys():
-            comp_sheet_to_clear = f"{entity_name_to_clear} Comparison"
-            if comp_sheet_to_clear in output_workbook.sheetnames: del output_workbook[comp_sheet_to_clear]
-        if METADATA_SHEET_NAME in output_workbook.sheetnames: del output_workbook[METADATA_SHEET_NAME]
+        # Drop stale comparison sheets and Metadata in one pass over the workbook's sheets,
+        # instead of rebuilding sheetnames and looking each sheet up by name per entity
+        sheet_titles_to_clear = {f"{entity_name_to_clear} Comparison" for entity_name_to_clear in api_data_for_comparison}
+        sheet_titles_to_clear.add(METADATA_SHEET_NAME)
+        for stale_sheet in [ws for ws in output_workbook.worksheets if ws.title in sheet_titles_to_clear]:
+            output_workbook.remove(stale_sheet)
 
         write_comparison_sheets(output_workbook, sheet_data_for_comparison_recomp, api_data_for_comparison, intermediate_data_recomp)
+        # Release the per-row detail dicts before the save builds its XML
+        del sheet_data_for_comparison_recomp, intermediate_data_recomp, api_data_for_comparison
 
         metadata_sheet = output_workbook.create_sheet(title=METADATA_SHEET_NAME)
         metadata_sheet[MAX_DN_ID_LABEL_CELL] = "Max DN API ID (Comparison Run)"; metadata_sheet[MAX_DN_ID_LABEL_CELL].font = Font(bold=True)
         metadata_sheet[MAX_DN_ID_VALUE_CELL] = overall_max_dn_id_recomp
         metadata_sheet[MAX_AG_ID_LABEL_CELL] = "Max AgentGroup API ID (Comparison Run)"; metadata_sheet[MAX_AG_ID_LABEL_CELL].font = Font(bold=True)
         metadata_sheet[MAX_AG_ID_VALUE_CELL] = overall_max_ag_id_recomp
-        output_workbook.save(processed_filepath)
+        save_workbook_atomically(output_workbook, processed_filepath)
         logger.info(f"Updated '{processed_filepath}' with new comparison and metadata.")
 
         if read_comparison_data(processed_filepath):
@@ -471,17 +529,20 @@ def update_config():
     try:
         settings_to_save = {
             'api_timeout': request.form.get('timeout', type=int, default=15),
+            'api_cache_ttl_seconds': request.form.get('cache_ttl_seconds', type=int, default=0),
             'ideal_agent_header_text': request.form.get('ideal_agent_header_text'),
             'ideal_agent_fallback_cell': request.form.get('ideal_agent_fallback_cell'),
             'vag_extraction_sheet': request.form.get('vag_extraction_sheet'),
             'log_level_str': request.form.get('log_level')
         }
         if settings_to_save.get('api_timeout') is None: settings_to_save['api_timeout'] = 15
+        if settings_to_save.get('api_cache_ttl_seconds') is None: settings_to_save['api_cache_ttl_seconds'] = 0
         if settings_to_save.get('log_level_str') is None: settings_to_save['log_level_str'] = 'INFO'
 
         config_path = current_app.config.get('CONFIG_FILE_PATH', 'config.ini')
         save_config(config_path, settings_to_save)
         current_app.config['APP_SETTINGS'].update(settings_to_save)
+        clear_api_response_cache() # Don't keep serving responses cached under the old settings
         logger.info("Configuration saved and application cache updated.")
         flash('Configuration saved successfully to config.ini. Restart may be needed for some changes.', 'success')
     except (IOError, ValueError, Exception) as e:
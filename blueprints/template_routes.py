@@ -18,6 +18,10 @@ import logging
 import datetime
 import requests
 import re # Added for placeholder logic
+try:
+    import orjson # Optional C JSON parser; not part of the offline wheelhouse
+except ImportError:
+    orjson = None
 from flask import (
     Blueprint, request, jsonify, render_template, abort, current_app, session, url_for # Added render_template, session, url_for
 )
@@ -26,6 +30,9 @@ from typing import Dict, Any, Optional, List # Added List
 # --- Constants ---
 TEMPLATE_DIR = './config_templates/' # Directory where JSON templates are stored
 LOG_FILE_UI = 'ui_viewer.log'        # Assuming shared log file with main app
+# Regex to find placeholders like {row.ColumnName} or {func.FunctionName};
+# captures type (row/func) and name. Compiled once rather than on every replace_placeholders call.
+PLACEHOLDER_PATTERN = re.compile(r'{(\w+)\.([^}]+)}')
 
 # --- Logging ---
 # Use the root logger configured in the main app (app.py)
@@ -58,9 +65,6 @@ def replace_placeholders(template_data: Any, row_data: dict, current_row_next_id
     Returns:
         The template structure with placeholders replaced.
     """
-    # Regex to find placeholders like {row.ColumnName} or {func.FunctionName}
-    placeholder_pattern = re.compile(r'{(\w+)\.([^}]+)}') # Captures type (row/func) and name
-
     # --- Inner replacement function ---
     def perform_replace(text: str) -> str:
         """Performs replacements on a single string."""
@@ -110,7 +114,7 @@ def replace_placeholders(template_data: Any, row_data: dict, current_row_next_id
                  return match.group(0) # Return the placeholder itself
 
         # Use re.sub with the handler function to replace all occurrences in the string
-        return placeholder_pattern.sub(replace_match, text)
+        return PLACEHOLDER_PATTERN.sub(replace_match, text)
     # --- End of inner replacement function ---
 
     # --- Main logic for traversing template data ---
@@ -361,11 +365,12 @@ def proxy_api_fetch():
         response = requests.get(url, timeout=10) # Use a reasonable timeout
         response.raise_for_status() # Raise HTTPError for bad status codes (4xx, 5xx)
 
-        # Attempt to parse JSON, but return raw text if it fails
+        # Attempt to parse JSON, but return raw text if it fails.
+        # orjson parses the raw bytes when available; both parsers' decode errors subclass json.JSONDecodeError.
         try:
-            api_data = response.json()
+            api_data = orjson.loads(response.content) if orjson is not None else response.json()
             logger.debug("Proxy fetch successful, parsed JSON response.")
-        except requests.exceptions.JSONDecodeError:
+        except json.JSONDecodeError:
             api_data = response.text
             logger.debug("Proxy fetch successful, but response was not valid JSON, returning as text.")
 
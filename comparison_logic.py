@@ -9,11 +9,25 @@ processed by the rule engine.
 import logging
 import openpyxl
 from openpyxl.styles import Font
-from openpyxl.utils import cell as openpyxl_cell_utils # For get_column_letter
-from typing import Dict, Any, Set
+from typing import Dict, Any, Set, Tuple
 
 logger = logging.getLogger(__name__) # Use module-specific logger
 
+# --- Constants for comparison sheet layout ---
+# Built once at import; openpyxl style objects are immutable so one bold Font is shared by all headers.
+HEADER_FONT = Font(bold=True)
+# Headers and approximate column widths for the 5-column Skill Exprs comparison sheet
+SKILL_EXPR_HEADERS = ("Concatenated Key", "Expression", "Ideal Expression", "ID (from API)", "Status")
+SKILL_EXPR_COL_WIDTHS = (45, 45, 35, 20, 35)
+# Trailing headers and widths for the standard 3-column sheets (first header is the entity name)
+STANDARD_TRAILING_HEADERS = ("ID (from API)", "Status")
+STANDARD_COL_WIDTHS = (45, 20, 35)
+# Column letters for the (at most 5) comparison columns, indexed by col_idx - 1
+COLUMN_LETTERS = ("A", "B", "C", "D", "E")
+# Status values written to the last column of each comparison row
+STATUS_NEW_IN_SHEET = "New in Sheet (Non-Struck)"
+STATUS_MISSING_FROM_SHEET = "Missing in Sheet (or only Struck Out)"
+
 # --- Comparison and Reporting ---
 def write_comparison_sheets(
     workbook: openpyxl.workbook.Workbook,
@@ -54,22 +68,27 @@ def write_comparison_sheets(
         # Proceed, as sheet might have data not in API
 
     # Determine which entity types to process based on the union of keys from both data sources
-    all_entity_keys_to_compare = set(sheet_data_for_comparison.keys()).union(set(api_data.keys()))
+    # (dict key views support set operations directly, without copying each side into a set first)
+    all_entity_keys_to_compare = sheet_data_for_comparison.keys() | api_data.keys()
     if not all_entity_keys_to_compare:
         logging.info("No common or unique entity keys found in sheet data or API data. Skipping comparison sheet generation.")
         return
 
+    # Snapshot sheet names once; workbook.sheetnames rebuilds a list on every access
+    existing_sheet_titles = set(workbook.sheetnames)
+
     # Iterate through each entity type found
-    for entity_name in sorted(list(all_entity_keys_to_compare)): # Process in a consistent order
+    for entity_name in sorted(all_entity_keys_to_compare): # Process in a consistent order
         # Use the entity_name (from the rule template) as the base for the sheet title
         sheet_title_prefix = entity_name
         logging.info(f"Generating comparison sheet for entity: '{entity_name}'")
         comparison_sheet_title = f"{sheet_title_prefix} Comparison"
 
         # Ensure sheet doesn't already exist (should have been removed by excel_processing.py)
-        if comparison_sheet_title in workbook.sheetnames:
+        if comparison_sheet_title in existing_sheet_titles:
             try:
                 del workbook[comparison_sheet_title]
+                existing_sheet_titles.discard(comparison_sheet_title)
                 logging.debug(f"Removed pre-existing sheet: {comparison_sheet_title}")
             except Exception as e:
                  logging.warning(f"Could not remove existing sheet '{comparison_sheet_title}': {e}")
@@ -82,7 +101,8 @@ def write_comparison_sheets(
         sheet_items_non_struck = sheet_data_for_comparison.get(entity_name, set())
         # Get API items for this entity (could be a dict of {key:id} or {key:details_dict})
         api_items_dict = api_data.get(entity_name, {})
-        api_items_keys = set(api_items_dict.keys()) # Get all keys (identifiers) from API data
+        # The dict's keys() view supports set operations directly, so no copy of the API keys is built
+        api_items_keys = api_items_dict.keys()
 
         # Calculate differences based on the primary identifying KEYS
         # Items present (non-struck) in sheet but not present in API
@@ -90,60 +110,78 @@ def write_comparison_sheets(
         # Items present in API but not present (non-struck) in sheet
         missing_from_sheet_non_struck = api_items_keys - sheet_items_non_struck
 
-        row_num = 2 # Start writing data rows from row 2
-
-        # --- Set Headers and Column Widths based on entity type ---
+        # --- Set Headers, Column Widths and Row Builders based on entity type ---
         # Heuristic to check if this entity is a "skill expression" type by its name.
         # This relies on the 'name' field in the excelrule_template.json.
         # A more robust method might involve a specific flag in the rule definition.
-        is_skill_expression_type = "expression" in entity_name.lower() or \
-                                   "skill_expr" in entity_name.lower()
+        # The check runs once per entity; the row builders chosen below keep it out of the row loops.
+        entity_name_lower = entity_name.lower()
+        is_skill_expression_type = "expression" in entity_name_lower or "skill_expr" in entity_name_lower
 
         if is_skill_expression_type:
-            # Define headers for the 5-column Skill Exprs comparison sheet
-            headers = ["Concatenated Key", "Expression", "Ideal Expression", "ID (from API)", "Status"]
-            # Define approximate column widths for better viewing
-            col_widths = [45, 45, 35, 20, 35]
+            # Use the precomputed 5-column Skill Exprs layout
+            headers = SKILL_EXPR_HEADERS
+            col_widths = SKILL_EXPR_COL_WIDTHS
+            # intermediate_data contains the fully resolved data for items found in the sheet.
+            sheet_item_details = intermediate_data.get(entity_name, {})
+
+            def build_new_row(item_key: str) -> Tuple[Any, ...]:
+                """Concatenated Key, Expression, Ideal Expression (from sheet), ID (N/A), Status."""
+                item_details_from_sheet = sheet_item_details.get(item_key, {})
+                return (
+                    item_key,
+                    item_details_from_sheet.get('expr', item_details_from_sheet.get('Expression', '')),
+                    item_details_from_sheet.get('ideal', item_details_from_sheet.get('Ideal Expression', '')),
+                    "N/A", # ID (Not applicable as it's not from API)
+                    STATUS_NEW_IN_SHEET
+                )
+
+            def build_missing_row(item_key: str) -> Tuple[Any, ...]:
+                """Concatenated Key, Expression, Ideal Expression, ID (all from API), Status."""
+                # For skill_exprs, api_items_dict[item_key] is a dict: {'id': ..., 'expr': ..., 'ideal': ...}
+                api_item_details = api_items_dict.get(item_key, {})
+                return (
+                    item_key,
+                    api_item_details.get('expr', ''),
+                    api_item_details.get('ideal', ''),
+                    api_item_details.get('id', 'ID Not Found'),
+                    STATUS_MISSING_FROM_SHEET
+                )
         else:
-            # Define headers for the standard 3-column comparison sheets
+            # Standard 3-column layout for VQ, Skill, VAG
             # Use the entity_name (which was sheet_title_prefix) as the first column header
-            headers = [entity_name, "ID (from API)", "Status"]
-            col_widths = [45, 20, 35]
+            headers = (entity_name,) + STANDARD_TRAILING_HEADERS
+            col_widths = STANDARD_COL_WIDTHS
+
+            def build_new_row(item_key: str) -> Tuple[Any, ...]:
+                """Item Name, ID (N/A), Status."""
+                return (item_key, "N/A", STATUS_NEW_IN_SHEET)
+
+            def build_missing_row(item_key: str) -> Tuple[Any, ...]:
+                """Item Name, ID from API, Status."""
+                # For these, api_items_dict[item_key] is just the ID string
+                return (item_key, api_items_dict.get(item_key, "ID Not Found"), STATUS_MISSING_FROM_SHEET)
 
         # Write headers to the sheet and apply formatting
         for col_idx, header_text in enumerate(headers, start=1):
             cell = sheet.cell(row=1, column=col_idx, value=header_text)
-            cell.font = Font(bold=True) # Make headers bold
+            cell.font = HEADER_FONT # Make headers bold (shared Font instance)
             # Set column width for better readability
             try:
-                column_letter = openpyxl_cell_utils.get_column_letter(col_idx)
+                column_letter = COLUMN_LETTERS[col_idx-1]
                 sheet.column_dimensions[column_letter].width = col_widths[col_idx-1]
-            except IndexError: # Safety check for col_widths definition
+            except IndexError: # Safety check for col_widths/COLUMN_LETTERS definition
                  pass # Ignore error if width definition is wrong
 
 
-        # --- Write Data Rows ---
+        # --- Write Data Rows (appended below the header row) ---
 
         # Write items that are "New in Sheet"
         if new_in_sheet:
             logging.debug(f"'{entity_name}' - Found {len(new_in_sheet)} items New in Sheet (Non-Struck).")
             # Sort items alphabetically by key for consistent report order
-            for item_key in sorted(list(new_in_sheet)):
-                if is_skill_expression_type:
-                    # Lookup details from intermediate_data (which originates from sheet processing)
-                    # intermediate_data contains the fully resolved data for items found in the sheet.
-                    item_details_from_sheet = intermediate_data.get(entity_name, {}).get(item_key, {})
-                    sheet.cell(row=row_num, column=1, value=item_key) # Concatenated Key
-                    sheet.cell(row=row_num, column=2, value=item_details_from_sheet.get('expr', item_details_from_sheet.get('Expression',''))) # Expression from sheet
-                    sheet.cell(row=row_num, column=3, value=item_details_from_sheet.get('ideal', item_details_from_sheet.get('Ideal Expression',''))) # Ideal Expression from sheet
-                    sheet.cell(row=row_num, column=4, value="N/A") # ID (Not applicable as it's not from API)
-                    sheet.cell(row=row_num, column=5, value="New in Sheet (Non-Struck)") # Status
-                else:
-                    # Standard 3-column layout for VQ, Skill, VAG
-                    sheet.cell(row=row_num, column=1, value=item_key) # Item Name
-                    sheet.cell(row=row_num, column=2, value="N/A") # ID
-                    sheet.cell(row=row_num, column=3, value="New in Sheet (Non-Struck)") # Status
-                row_num += 1
+            for item_key in sorted(new_in_sheet):
+                sheet.append(build_new_row(item_key))
         else:
              # Log if no items were found only in the sheet
              logging.debug(f"'{entity_name}' - No items found only in the sheet (non-struck).")
@@ -152,24 +190,8 @@ def write_comparison_sheets(
         if missing_from_sheet_non_struck:
              logging.debug(f"'{entity_name}' - Found {len(missing_from_sheet_non_struck)} items Missing from Sheet (or only Struck Out).")
              # Sort items alphabetically by key for consistent report order
-             for item_key in sorted(list(missing_from_sheet_non_struck)):
-                if is_skill_expression_type:
-                    # Lookup details from api_data (which originates from API)
-                    # For skill_exprs, api_items_dict[item_key] is a dict: {'id': ..., 'expr': ..., 'ideal': ...}
-                    api_item_details = api_items_dict.get(item_key, {})
-                    sheet.cell(row=row_num, column=1, value=item_key) # Concatenated Key
-                    sheet.cell(row=row_num, column=2, value=api_item_details.get('expr', '')) # Expression from API
-                    sheet.cell(row=row_num, column=3, value=api_item_details.get('ideal', '')) # Ideal Expression from API
-                    sheet.cell(row=row_num, column=4, value=api_item_details.get('id', 'ID Not Found')) # ID from API
-                    sheet.cell(row=row_num, column=5, value="Missing in Sheet (or only Struck Out)") # Status
-                else:
-                    # Standard 3-column layout for VQ, Skill, VAG
-                    # For these, api_items_dict[item_key] is just the ID string
-                    api_id_value = api_items_dict.get(item_key, "ID Not Found")
-                    sheet.cell(row=row_num, column=1, value=item_key) # Item Name
-                    sheet.cell(row=row_num, column=2, value=api_id_value) # ID from API
-                    sheet.cell(row=row_num, column=3, value="Missing in Sheet (or only Struck Out)") # Status
-                row_num += 1
+             for item_key in sorted(missing_from_sheet_non_struck):
+                sheet.append(build_missing_row(item_key))
         else:
             # Log if no items were found only in the API data
             logging.debug(f"'{entity_name}' - No items found only in the API (when compared to non-struck sheet items).")
@@ -10,27 +10,18 @@ and the source Excel file is handled via UI upload.
 import configparser
 import logging # Import logging module to use its constants
 import os
-from typing import Dict, Any
-
-# Import openpyxl utils for cell coordinate validation, if still needed for other parts
-# from openpyxl.utils import cell as openpyxl_cell_utils # Not directly used here anymore
+import re
+import tempfile
+from typing import Dict, Any, Tuple
 
 logger = logging.getLogger(__name__) # Use module-specific logger
 
-# Define the expected structure of the config.ini file for validation.
-# 'API' section now only expects 'timeout'.
-# 'SheetLayout' keys are kept as they might be used as fallbacks.
-# 'Files' section is no longer actively used for 'source_file' by the UI workflow.
-EXPECTED_CONFIG = {
-    'API': ['timeout'],
-    'SheetLayout': ['ideal_agent_header_text', 'ideal_agent_fallback_cell', 'vag_extraction_sheet'],
-    'Logging': ['level']
-    # 'Files': [] # Can be omitted if truly no global file settings are expected
-}
-
 # Define default values for settings if they are missing in config.ini.
 DEFAULT_CONFIG = {
-    'API': {'timeout': '15'}, # Timeout as string initially, converted later
+    'API': {
+        'timeout': '15', # Timeout as string initially, converted later
+        'cache_ttl_seconds': '0' # How long fetched API responses are reused; 0 disables the cache
+    },
     'SheetLayout': {
         'ideal_agent_header_text': 'Ideal Agent',
         'ideal_agent_fallback_cell': 'C2',
@@ -39,6 +30,26 @@ DEFAULT_CONFIG = {
     'Logging': {'level': 'INFO'} # Default logging level
 }
 
+
+def _render_ini(sections: Dict[str, Dict[str, Any]]) -> str:
+    """
+    Renders a {section: {key: value}} mapping as INI text in the same layout
+    configparser.write produces, joined into one string so it can be written at once.
+    """
+    lines = []
+    for section, section_keys_values in sections.items():
+        lines.append(f"[{section}]")
+        for key, value in section_keys_values.items():
+            # Multi-line values become indented continuation lines, as configparser writes them
+            value_text = str(value).replace('\n', '\n\t')
+            lines.append(f"{key} = {value_text}")
+        lines.append("") # Blank line after each section, as configparser writes it
+    return "\n".join(lines) + "\n"
+
+# The default config.ini contents, rendered once at import for ensure_default_config.
+_DEFAULT_INI_TEXT = _render_ini(DEFAULT_CONFIG)
+
+
 # Mapping from log level strings (read from config) to logging module constants.
 LOG_LEVEL_MAP = {
     'DEBUG': logging.DEBUG,
@@ -49,6 +60,98 @@ LOG_LEVEL_MAP = {
 }
 # Reverse mapping for saving the logging level string back to config.ini.
 LOG_LEVEL_TO_STRING_MAP = {v: k for k, v in LOG_LEVEL_MAP.items()}
+# Lookup table accepting both the upper- and lower-case spellings, so the common cases
+# resolve without allocating an upper-cased copy of the value.
+_LOG_LEVEL_MAP_CI = dict(LOG_LEVEL_MAP)
+_LOG_LEVEL_MAP_CI.update({k.lower(): v for k, v in LOG_LEVEL_MAP.items()})
+
+
+def _log_level_from_string(value_str: str) -> int:
+    """Converts a log level name (case-insensitive) to its logging constant; raises ValueError if unknown."""
+    log_level = _LOG_LEVEL_MAP_CI.get(value_str)
+    if log_level is None: # Mixed case (e.g. 'Warning') is rare; fall back to upper-casing
+        log_level = LOG_LEVEL_MAP.get(value_str.upper())
+    if log_level is None:
+        raise ValueError(f"Invalid logging level '{value_str}'.")
+    return log_level
+
+
+# Flat schema of the expected config.ini settings, processed by load_config in one pass.
+# Each row is (section, key in config.ini, internal settings key, converter).
+# 'API' section expects 'timeout' and 'cache_ttl_seconds'.
+# 'SheetLayout' keys are kept as they might be used as fallbacks.
+# 'Files' section is no longer actively used for 'source_file' by the UI workflow.
+# Defaults come from DEFAULT_CONFIG; converters raise ValueError for invalid values,
+# in which case the (converted) default is used instead.
+CONFIG_KEY_SPEC = (
+    ('API', 'timeout', 'api_timeout', int),
+    ('API', 'cache_ttl_seconds', 'api_cache_ttl_seconds', int),
+    ('SheetLayout', 'ideal_agent_header_text', 'ideal_agent_header_text', str),
+    ('SheetLayout', 'ideal_agent_fallback_cell', 'ideal_agent_fallback_cell', str),
+    ('SheetLayout', 'vag_extraction_sheet', 'vag_extraction_sheet', str),
+    ('Logging', 'level', 'log_level_value', _log_level_from_string),
+)
+
+# Flat (section, key) -> default string view of DEFAULT_CONFIG, so each default is one lookup.
+_DEFAULTS_FLAT = {
+    (section, key): value
+    for section, section_keys_values in DEFAULT_CONFIG.items()
+    for key, value in section_keys_values.items()
+}
+
+# Cache of fully processed settings, keyed by absolute config path
+# (so 'config.ini' and './config.ini' share one entry).
+# Each entry is (st_mtime_ns, st_size, settings); an entry is only reused while the
+# file's modification time and size are unchanged, and save_config drops it.
+_CONFIG_CACHE: Dict[str, Tuple[int, int, Dict[str, Any]]] = {}
+
+
+# Pattern for a plain Excel cell coordinate such as "C2": 1-3 column letters, then a row
+# number >= 1. Either case is accepted, as openpyxl does. The sheet limits (column XFD,
+# row 1048576) are checked by _is_valid_cell_coordinate.
+# Used to validate 'ideal_agent_fallback_cell' without importing openpyxl.
+CELL_COORDINATE_PATTERN = re.compile(r'([A-Za-z]{1,3})([1-9][0-9]{0,6})')
+EXCEL_MAX_COLUMN = 16384 # Column XFD
+EXCEL_MAX_ROW = 1048576
+
+
+def _is_valid_cell_coordinate(value_str: str) -> bool:
+    """Checks that value_str is a cell coordinate like "C2" within Excel's sheet limits."""
+    coordinate_match = CELL_COORDINATE_PATTERN.fullmatch(value_str)
+    if not coordinate_match:
+        return False
+    column_letters, row_digits = coordinate_match.groups()
+    column_index = 0
+    for letter in column_letters.upper():
+        column_index = column_index * 26 + (ord(letter) - ord('A') + 1)
+    return column_index <= EXCEL_MAX_COLUMN and int(row_digits) <= EXCEL_MAX_ROW
+
+
+def ensure_default_config(config_path: str) -> bool:
+    """
+    Writes a config.ini populated with DEFAULT_CONFIG if the file doesn't exist yet.
+    Called once at app startup; load_config itself never writes the file.
+
+    Args:
+        config_path: Path to the config.ini file.
+
+    Returns:
+        True if a default file was created, False if the file already existed.
+
+    Raises:
+        FileNotFoundError: If the default file cannot be created.
+    """
+    if os.path.exists(config_path):
+        return False
+    try:
+        # Write the pre-rendered default configuration to the specified path
+        with open(config_path, 'w', encoding='utf-8') as default_configfile:
+            default_configfile.write(_DEFAULT_INI_TEXT)
+    except Exception as e_create:
+        logger.error(f"Could not create default configuration file at '{config_path}': {e_create}")
+        raise FileNotFoundError(f"Configuration file '{config_path}' not found and could not be created.")
+    logger.info(f"Created default configuration file at '{config_path}'. Please review it.")
+    return True
 
 
 def load_config(config_path: str) -> Dict[str, Any]:
@@ -56,6 +159,8 @@ def load_config(config_path: str) -> Dict[str, Any]:
     Loads configuration from the specified INI file.
     Uses defaults for missing optional values. Validates expected sections/options.
     Converts logging level string to a logging constant and timeout to an integer.
+    Parsed settings are cached per path and reused until the file's mtime or size changes.
+    If the file doesn't exist, the built-in defaults are used without creating it.
 
     Args:
         config_path: Path to the config.ini file.
@@ -65,109 +170,90 @@ def load_config(config_path: str) -> Dict[str, Any]:
         'api_timeout' (int) and 'log_level_value' (logging constant) are used.
 
     Raises:
-        FileNotFoundError: If the config file doesn't exist and cannot be created with defaults.
-        ValueError: For missing expected sections/options or type conversion errors.
+        ValueError: For an unreadable or unparsable file, or missing expected options without defaults.
     """
     logger.info(f"Attempting to load configuration from: {config_path}")
-    config = configparser.ConfigParser(interpolation=None) # Disable % interpolation
 
-    # Check if the configuration file exists
-    if not os.path.exists(config_path):
-        logger.warning(f"Configuration file '{config_path}' not found. Attempting to create with defaults.")
-        # Attempt to create a default config file if it doesn't exist
-        try:
-            default_config_obj = configparser.ConfigParser(interpolation=None)
-            # Populate with sections and keys from DEFAULT_CONFIG
-            for section, section_keys_values in DEFAULT_CONFIG.items():
-                default_config_obj[section] = section_keys_values
-            # Write the default configuration to the specified path
-            with open(config_path, 'w', encoding='utf-8') as default_configfile:
-                default_config_obj.write(default_configfile)
-            logger.info(f"Created default configuration file at '{config_path}'. Please review it.")
-            # Now read the newly created default config
-            config.read(config_path, encoding='utf-8')
-        except Exception as e_create:
-            logger.error(f"Could not create default configuration file at '{config_path}': {e_create}")
-            raise FileNotFoundError(f"Configuration file '{config_path}' not found and could not be created.")
-
-    # Read the configuration file (might be the newly created default one)
+    # Serve from the cache if the file hasn't changed since it was last parsed
+    cache_stamp = None
     try:
-        # Ensure config object is fresh if it was just created by reading it again
-        if not config.sections(): # If config is empty (e.g. read failed silently before)
-            config.read(config_path, encoding='utf-8')
-    except configparser.Error as e:
-        logger.error(f"Error parsing configuration file '{config_path}': {e}")
-        raise ValueError(f"Error parsing configuration file: {e}")
+        file_stat = os.stat(config_path)
+        cache_stamp = (file_stat.st_mtime_ns, file_stat.st_size)
+    except OSError:
+        pass # File missing or unreadable; defaults are used below
+    cache_key = os.path.abspath(config_path)
+    cached_entry = _CONFIG_CACHE.get(cache_key)
+    if cache_stamp is not None and cached_entry is not None and cached_entry[:2] == cache_stamp:
+        logger.info("Configuration unchanged on disk; using cached settings.")
+        return dict(cached_entry[2]) # Shallow copy: callers may update their dict
+
+    config = configparser.RawConfigParser() # Raw parser: no % interpolation
+
+    # Check if the configuration file exists (the stat above already told us)
+    if cache_stamp is None:
+        # Use the built-in defaults in memory; nothing is written to disk here.
+        # Callers that want a default file on disk can call ensure_default_config().
+        logger.warning(f"Configuration file '{config_path}' not found. Using built-in defaults.")
+        config.read_dict(DEFAULT_CONFIG)
+    else:
+        # Read the configuration file. read_file (unlike read) doesn't silently skip a
+        # file it can't open, so an unreadable config isn't mistaken for an empty one.
+        try:
+            with open(config_path, 'r', encoding='utf-8') as configfile:
+                config.read_file(configfile)
+        except OSError as e:
+            logger.error(f"Error reading configuration file '{config_path}': {e}")
+            raise ValueError(f"Error reading configuration file: {e}")
+        except configparser.Error as e:
+            logger.error(f"Error parsing configuration file '{config_path}': {e}")
+            raise ValueError(f"Error parsing configuration file: {e}")
 
     # Dictionary to store the loaded settings using internal, consistent key names
-    settings = {}
-
-    # Validate and extract settings based on the EXPECTED_CONFIG structure
-    for section, keys in EXPECTED_CONFIG.items():
-        # Check if the section exists in the file or defaults
-        if not config.has_section(section):
-            if section in DEFAULT_CONFIG:
-                 logger.warning(f"Config section '[{section}]' not found, using defaults for this section.")
-                 # Add default section to config object for consistent processing below
-                 config[section] = DEFAULT_CONFIG[section]
-            elif keys: # Only raise if keys were expected for this section
-                 msg = f"Missing required section '[{section}]' in configuration file and no defaults provided."
-                 logger.error(msg)
-                 raise ValueError(msg)
-            else: # Section has no required keys, okay if missing
-                logger.debug(f"Section '[{section}]' not found, but no keys required. Skipping.")
-                continue # Skip key processing for this section
-
-        # Process each expected key within the section
-        for key in keys:
-            if config.has_option(section, key):
-                value_str = config.get(section, key)
-            elif key in DEFAULT_CONFIG.get(section, {}): # Check if key has a default in this section
-                value_str = DEFAULT_CONFIG[section][key]
-                logger.debug(f"Setting '{key}' in '[{section}]' not found, using default: {value_str}")
-            else:
+    settings: Dict[str, Any] = {}
+    missing_sections_reported = set() # Sections already reported as missing
+
+    # Validate, convert and extract every setting in a single pass over CONFIG_KEY_SPEC
+    for section, key, internal_key, convert in CONFIG_KEY_SPEC:
+        default_value_str = _DEFAULTS_FLAT.get((section, key))
+        try:
+            # Single mapping lookup; KeyError covers both a missing section and a missing option
+            value_str = config[section][key]
+        except KeyError:
+            if default_value_str is None:
                 # Option is expected but missing and has no default
                 msg = f"Missing expected option '{key}' in section '[{section}]' and no default provided."
                 logger.error(msg)
                 raise ValueError(msg)
-
-            # Perform type conversion and specific key mapping for internal use
-            if key == 'timeout' and section == 'API':
-                try:
-                    # Store timeout as integer under the key 'api_timeout'
-                    settings['api_timeout'] = int(value_str)
-                except ValueError:
-                    msg = f"Invalid integer value for '{key}' in section '[{section}]': '{value_str}'. Using default 15."
-                    logger.warning(msg)
-                    settings['api_timeout'] = 15 # Fallback default for timeout
-            elif key == 'level' and section == 'Logging':
-                # Convert log level string to logging constant
-                log_level_str_upper = value_str.upper()
-                settings['log_level_value'] = LOG_LEVEL_MAP.get(log_level_str_upper, logging.INFO)
-                # Store the string representation as well, for saving back and UI display
-                settings['log_level_str'] = LOG_LEVEL_TO_STRING_MAP.get(settings['log_level_value'], 'INFO')
-                if log_level_str_upper not in LOG_LEVEL_MAP:
-                    logger.warning(f"Invalid logging level '{value_str}' in config. Defaulting to INFO.")
+            value_str = default_value_str
+            if section not in config:
+                if section not in missing_sections_reported:
+                    logger.warning(f"Config section '[{section}]' not found, using defaults for this section.")
+                    missing_sections_reported.add(section)
             else:
-                # Store other keys as strings using the original key name from config.ini
-                settings[key] = value_str
+                logger.debug(f"Setting '{key}' in '[{section}]' not found, using default: {value_str}")
 
+        # Perform type conversion and store under the internal key name
+        try:
+            settings[internal_key] = convert(value_str)
+        except ValueError:
+            logger.warning(f"Invalid value for '{key}' in section '[{section}]': '{value_str}'. Using default {default_value_str}.")
+            settings[internal_key] = convert(default_value_str)
+
+    # Store the log level's string representation as well, for saving back and UI display
+    settings['log_level_str'] = LOG_LEVEL_TO_STRING_MAP.get(settings['log_level_value'], 'INFO')
 
     # --- Post-load validation for specific settings (if any remain critical) ---
     # Example: Validate fallback cell format (e.g., "C2")
     fallback_cell_key = 'ideal_agent_fallback_cell'
     if fallback_cell_key in settings:
-        try:
-            # Import only when needed, to avoid circular dependencies if utils.py imports config.py
-            from openpyxl.utils import cell as openpyxl_cell_utils_validator
-            openpyxl_cell_utils_validator.coordinate_to_tuple(settings[fallback_cell_key])
-        except openpyxl_cell_utils_validator.IllegalCharacterError:
+        if not _is_valid_cell_coordinate(str(settings[fallback_cell_key])):
             msg = f"Invalid format for '{fallback_cell_key}' in config: {settings[fallback_cell_key]}"
             logging.warning(f"{msg} This setting might not work as expected.")
-        except ImportError:
-            logger.warning("openpyxl.utils.cell could not be imported. Skipping ideal_agent_fallback_cell validation.")
     # If the key 'ideal_agent_fallback_cell' is strictly required, a check for its existence
-    # should be here or implicitly handled by EXPECTED_CONFIG.
+    # should be here or implicitly handled by CONFIG_KEY_SPEC.
+
+    if cache_stamp is not None:
+        _CONFIG_CACHE[cache_key] = (cache_stamp[0], cache_stamp[1], dict(settings))
 
     logger.info("Configuration loaded successfully.")
     return settings
@@ -177,15 +263,21 @@ def save_config(config_path: str, settings: Dict[str, Any]):
     """
     Saves the provided settings dictionary to the INI configuration file.
     Organizes settings into sections. API URLs are no longer managed here.
+    Nothing is written if the file already contains exactly the serialized settings.
 
     Args:
         config_path: Path to the config.ini file.
         settings: Dictionary containing the configuration settings to save.
                   Keys should match the keys used internally by the application
                   (e.g., 'api_timeout', 'log_level_str').
+
+    Raises:
+        TypeError: If a SheetLayout setting is neither a string nor None.
+        IOError: If the file (or its directory) cannot be written.
     """
     logger.info(f"Attempting to save configuration to: {config_path}")
-    config = configparser.ConfigParser(interpolation=None)
+    # Plain {section: {key: value}} dict; no parser is needed just to write the file
+    config: Dict[str, Dict[str, str]] = {}
 
     # Reconstruct config structure from the 'settings' dict for writing to INI
 
@@ -193,20 +285,29 @@ def save_config(config_path: str, settings: Dict[str, Any]):
     config['API'] = {}
     if 'api_timeout' in settings: # Use internal key 'api_timeout'
         config['API']['timeout'] = str(settings['api_timeout']) # Save as string in INI
+    if 'api_cache_ttl_seconds' in settings:
+        config['API']['cache_ttl_seconds'] = str(settings['api_cache_ttl_seconds'])
 
     # SheetLayout Section
+    # A None value (e.g. a form field that wasn't submitted) is left out, so loading falls back
+    # to the default instead of reading back the text "None". Other values must be strings,
+    # as configparser required.
     config['SheetLayout'] = {}
-    if 'ideal_agent_header_text' in settings:
-        config['SheetLayout']['ideal_agent_header_text'] = settings['ideal_agent_header_text']
-    if 'ideal_agent_fallback_cell' in settings:
-        config['SheetLayout']['ideal_agent_fallback_cell'] = settings['ideal_agent_fallback_cell']
-    if 'vag_extraction_sheet' in settings:
-        config['SheetLayout']['vag_extraction_sheet'] = settings['vag_extraction_sheet']
+    for layout_key in ('ideal_agent_header_text', 'ideal_agent_fallback_cell', 'vag_extraction_sheet'):
+        layout_value = settings.get(layout_key)
+        if layout_value is None:
+            continue
+        if not isinstance(layout_value, str):
+            raise TypeError(f"Setting '{layout_key}' must be a string, got {type(layout_value).__name__}.")
+        config['SheetLayout'][layout_key] = layout_value
 
     # Logging Section
     config['Logging'] = {}
     if 'log_level_str' in settings: # Use the string representation for saving
-        config['Logging']['level'] = settings['log_level_str'].upper() # Ensure uppercase
+        log_level_str = settings['log_level_str']
+        if log_level_str not in LOG_LEVEL_MAP: # Already-uppercase names need no copy
+            log_level_str = log_level_str.upper() # Ensure uppercase
+        config['Logging']['level'] = log_level_str
     elif 'log_level_value' in settings: # Fallback if only the logging constant is present
         # Convert logging constant back to string
         config['Logging']['level'] = LOG_LEVEL_TO_STRING_MAP.get(settings['log_level_value'], 'INFO')
@@ -215,7 +316,7 @@ def save_config(config_path: str, settings: Dict[str, Any]):
 
 
     # Files Section (No longer actively used for source_file by UI, but keep section for structure)
-    if not config.has_section('Files'): # Create section if it doesn't exist
+    if 'Files' not in config: # Create section if it doesn't exist
         config['Files'] = {}
     # If you had other file-related settings, they would be added here:
     # if 'some_other_file_setting' in settings:
@@ -224,19 +325,54 @@ def save_config(config_path: str, settings: Dict[str, Any]):
 
     # Ensure parent directory exists before writing
     config_dir = os.path.dirname(config_path)
-    # Check if config_dir is not empty (i.e., not the current directory)
-    if config_dir and not os.path.exists(config_dir):
+    # Check if config_dir is not empty (i.e., not the current directory).
+    # exist_ok makes this a single mkdir attempt instead of an exists() check first.
+    if config_dir:
         try:
-            os.makedirs(config_dir)
-            logger.info(f"Created directory for config file: {config_dir}")
+            os.makedirs(config_dir, exist_ok=True)
         except OSError as e:
             logger.error(f"Could not create directory for config file '{config_path}': {e}")
             raise IOError(f"Failed to create directory for config file: {e}")
 
-    # Write the configuration to the file
+    # Serialize into one string first so the file is written with a single write() call
+    config_bytes = _render_ini(config).encode('utf-8')
+
+    # Skip the write entirely if the file already holds exactly this content.
+    # This keeps the file's mtime (and therefore the load_config cache entry) intact.
+    existing_mode = None # Permission bits of the current file, carried over to its replacement
+    try:
+        with open(config_path, 'rb') as existing_file:
+            if existing_file.read() == config_bytes:
+                logger.info("Configuration unchanged; skipping save.")
+                return
+            existing_mode = os.fstat(existing_file.fileno()).st_mode & 0o7777
+    except OSError:
+        pass # Missing or unreadable; fall through and write it
+
+    # Write the configuration to a uniquely named temp file in the same directory, then
+    # atomically swap it into place (concurrent saves never write the same temp file)
     try:
-        with open(config_path, 'w', encoding='utf-8') as configfile:
-            config.write(configfile)
+        temp_fd, temp_config_path = tempfile.mkstemp(
+            dir=config_dir or '.', prefix=os.path.basename(config_path) + '.', suffix='.tmp'
+        )
+        try:
+            # Buffered handle: the payload is smaller than the buffer, so flush() issues one
+            # write(), and unlike a raw unbuffered handle it never returns after a short write.
+            with open(temp_fd, 'wb') as configfile:
+                if existing_mode is not None:
+                    os.chmod(temp_config_path, existing_mode) # mkstemp creates the file owner-only
+                configfile.write(config_bytes)
+                configfile.flush()
+                os.fsync(configfile.fileno()) # Data is on disk before the rename makes it visible
+            os.replace(temp_config_path, config_path)
+        except BaseException:
+            # Don't leave a half-written temp file behind; the original config is untouched
+            try:
+                os.remove(temp_config_path)
+            except OSError:
+                pass
+            raise
+        _CONFIG_CACHE.pop(os.path.abspath(config_path), None) # Force the next load_config to re-parse
         logger.info("Configuration saved successfully.")
     except IOError as e:
         logger.error(f"Error writing configuration file '{config_path}': {e}", exc_info=True)
@@ -9,15 +9,17 @@ workbook object with standardized sheets for each entity type.
 
 This script is designed to be potentially user-editable for its parsing logic
 if the default behavior needs adjustment for specific source Excel formats.
-It aims to be self-contained for its parsing duties.
+It aims to be self-contained for its parsing duties; only the skill-expression
+normalization and skill-name pattern come from utils.py, so the parser's keys
+line up with the API side's.
 """
 
 import logging
 import openpyxl
 from openpyxl.styles import Font
 from openpyxl.utils import cell as openpyxl_cell_utils
-import re
 from typing import Dict, Any, Optional, Tuple, Set, List
+from utils import normalize_skill_expression, SKILL_NAME_PATTERN
 
 # --- Logger for this module ---
 # If run standalone, this will configure a basic logger.
@@ -49,9 +51,9 @@ def _extract_skills_from_expression(expression: str) -> list[str]:
     """
     if not isinstance(expression, str):
         return []
-    # Regex finds words (alphanumeric or underscore) followed immediately by '>' and one or more digits
-    skills = re.findall(r'\b([a-zA-Z0-9_]+)(?=>\d+)', expression)
-    logger.debug(f"Extracted skills {skills} from expression '{expression}'")
+    skills = SKILL_NAME_PATTERN.findall(expression)
+    if logger.isEnabledFor(logging.DEBUG): # Skip building the message when debug logging is off
+        logger.debug(f"Extracted skills {skills} from expression '{expression}'")
     return skills
 
 def _identify_ideal_agent_column(
@@ -79,20 +81,20 @@ def _identify_ideal_agent_column(
     # --- MODIFICATION START: Iterate through cell addresses and parse directly ---
     for cell_address in ideal_agent_cell_addresses:
         try:
-            # Parse the cell address to get column string and row number
-            col_str, row_idx_from_address = openpyxl_cell_utils.coordinate_to_tuple(cell_address)
-            # Convert column string (e.g., "C") to column index (e.g., 3)
-            col_idx_to_check = openpyxl_cell_utils.column_index_from_string(col_str)
+            # Parse the cell address (e.g., "C1") into its 1-based (row, column) indices
+            row_idx_from_address, col_idx_to_check = openpyxl_cell_utils.coordinate_to_tuple(cell_address)
 
-            # Check if the parsed cell address is within the sheet's bounds
-            if row_idx_from_address <= sheet.max_row and col_idx_to_check <= sheet.max_column:
+            # Check if the parsed cell address is within the sheet's bounds.
+            # Read-only sheets saved without a dimension record report None; treat those as unbounded.
+            max_row, max_column = sheet.max_row, sheet.max_column
+            if (max_row is None or row_idx_from_address <= max_row) and (max_column is None or col_idx_to_check <= max_column):
                 cell_value = sheet.cell(row=row_idx_from_address, column=col_idx_to_check).value
                 if cell_value and ideal_agent_header_text in str(cell_value):
                     logger.debug(f"Found '{ideal_agent_header_text}' at cell '{cell_address}' (Column {col_idx_to_check}). Using this column for 'Ideal Agent' data.")
                     return col_idx_to_check # Return the column index where the header was found
             else:
                 logger.debug(f"Cell address '{cell_address}' is out of bounds for sheet '{sheet.title}'.")
-        except openpyxl_cell_utils.IllegalCharacterError:
+        except ValueError: # coordinate_to_tuple rejects malformed addresses with ValueError
             logger.warning(f"Invalid cell address format in ideal_agent_cell_addresses: '{cell_address}'. Skipping this address.")
         except Exception as e:
              logger.warning(f"Could not parse or check ideal agent location '{cell_address}': {e}")
@@ -115,6 +117,8 @@ def parse_source_excel_to_standardized_workbook(
     Args:
         source_workbook: The openpyxl.Workbook object of the original uploaded Excel.
                          Expected to be loaded with style information to detect strikethrough.
+                         It is only read, row by row, so it can (and should) be opened with
+                         read_only=True, which streams rows instead of building every cell.
     Returns:
         A new openpyxl.Workbook object containing the parsed and standardized entity sheets.
     """
@@ -134,6 +138,16 @@ def parse_source_excel_to_standardized_workbook(
         "VAGs": set()
     }
 
+    # Local bindings for the containers filled in the per-cell loop
+    vq_names = parsed_data["VQs"]
+    skill_names = parsed_data["Skills"]
+    skill_expressions = parsed_data["Skill_Expressions"]
+    vag_names = parsed_data["VAGs"]
+
+    # Checked once: the per-cell debug messages below would otherwise be formatted
+    # (including cell.coordinate) for every cell even when debug logging is off.
+    debug_logging_enabled = logger.isEnabledFor(logging.DEBUG)
+
     # --- Iterate through sheets and cells of the source workbook ---
     for sheet in source_workbook.worksheets:
         if sheet.title in sheets_to_skip:
@@ -141,47 +155,49 @@ def parse_source_excel_to_standardized_workbook(
             continue
 
         logger.info(f"Built-in parser processing sheet: {sheet.title}")
+        is_vag_sheet = sheet.title == vag_sheet_name_hint # VAGs are only taken from this sheet
         ideal_agent_col_idx = _identify_ideal_agent_column(
             sheet,
             ideal_agent_header,
             ideal_agent_cell_addrs # Pass the list of addresses
         )
 
-        for row_idx in range(1, sheet.max_row + 1):
-            for col_idx in range(1, sheet.max_column + 1):
-                cell = sheet.cell(row=row_idx, column=col_idx)
-                if cell.value is None:
+        # Walk the sheet row by row. iter_rows streams rows in read-only mode, where
+        # random access through sheet.cell() would re-scan the sheet XML for every call.
+        for row_cells in sheet.iter_rows():
+            for cell in row_cells:
+                value_str_raw = cell.value
+                # Only text can hold a VQ, VAG or skill expression; this also skips empty cells
+                # and spares numbers/dates a str() conversion and a font lookup.
+                if not isinstance(value_str_raw, str):
                     continue
-                
-                value_str_raw = str(cell.value)
+
                 value_str_stripped = value_str_raw.strip()
 
                 if not value_str_stripped:
                     continue
 
                 if cell.font and cell.font.strike:
-                    logger.debug(f"Skipping struck-through cell {cell.coordinate}: '{value_str_raw}'")
+                    if debug_logging_enabled:
+                        logger.debug(f"Skipping struck-through cell {cell.coordinate}: '{value_str_raw}'")
                     continue
 
-                if (value_str_stripped.lower().startswith("vq_") or "vq" in value_str_stripped.lower()) and ">" not in value_str_stripped:
-                    cleaned_vq = value_str_stripped.replace(" ", "").replace('\u00A0', '')
-                    if cleaned_vq:
-                        parsed_data["VQs"].add(cleaned_vq)
-                        logger.debug(f"Parser found VQ: {cleaned_vq} from {cell.coordinate}")
-
-                elif ">" in value_str_stripped:
+                # Skill expressions are checked first, so plain-value branches below need no ">" test
+                if ">" in value_str_stripped:
                     raw_expression = value_str_stripped
                     ideal_expression_str = ""
-                    if ideal_agent_col_idx and ideal_agent_col_idx <= sheet.max_column:
-                        ideal_cell = sheet.cell(row=row_idx, column=ideal_agent_col_idx)
+                    if ideal_agent_col_idx and ideal_agent_col_idx <= len(row_cells):
+                        ideal_cell = row_cells[ideal_agent_col_idx - 1] # Same row, already loaded
                         if ideal_cell.value is not None:
                             if not (ideal_cell.font and ideal_cell.font.strike):
                                 ideal_expression_str = str(ideal_cell.value).strip()
                             else:
-                                logger.debug(f"Ideal Agent cell {ideal_cell.coordinate} is struck-through for expression '{raw_expression}'. Ignoring ideal part.")
+                                if debug_logging_enabled:
+                                    logger.debug(f"Ideal Agent cell {ideal_cell.coordinate} is struck-through for expression '{raw_expression}'. Ignoring ideal part.")
 
-                    cleaned_expression = raw_expression.replace(" ", "").replace('\u00A0', '').replace("|", " | ").replace("&", " & ")
-                    cleaned_ideal = ideal_expression_str.replace(" ", "").replace('\u00A0', '').replace("|", " | ").replace("&", " & ")
+                    cleaned_expression = normalize_skill_expression(raw_expression)
+                    # Rows without an Ideal Agent value skip the second normalization entirely
+                    cleaned_ideal = normalize_skill_expression(ideal_expression_str) if ideal_expression_str else ""
                     concatenated_key = cleaned_expression
                     if cleaned_ideal: concatenated_key = f"{cleaned_expression} {cleaned_ideal}".strip()
                     extracted_skills_list_for_this_expr = []
@@ -190,21 +206,30 @@ def parse_source_excel_to_standardized_workbook(
                         for skill in skills_from_expr:
                             cleaned_skill = skill.replace(" ", "").replace('\u00A0', '')
                             if cleaned_skill:
-                                parsed_data["Skills"].add(cleaned_skill)
+                                skill_names.add(cleaned_skill)
                                 extracted_skills_list_for_this_expr.append(cleaned_skill)
                     if cleaned_expression:
-                        parsed_data["Skill_Expressions"].append({
+                        skill_expressions.append({
                             "Original Expression": cleaned_expression, "Ideal Expression": cleaned_ideal,
                             "Concatenated Key": concatenated_key,
                             "Extracted_Skills_List_String": ", ".join(extracted_skills_list_for_this_expr)
                         })
-                        logger.debug(f"Parser found Skill Expression: {concatenated_key} from {cell.coordinate}")
+                        if debug_logging_enabled:
+                            logger.debug(f"Parser found Skill Expression: {concatenated_key} from {cell.coordinate}")
+
+                elif "vq" in value_str_stripped.lower(): # Covers the "vq_"/"VQ_" prefix; ">" was ruled out above
+                    cleaned_vq = value_str_stripped.replace(" ", "").replace('\u00A0', '')
+                    if cleaned_vq:
+                        vq_names.add(cleaned_vq)
+                        if debug_logging_enabled:
+                            logger.debug(f"Parser found VQ: {cleaned_vq} from {cell.coordinate}")
 
-                elif value_str_stripped.startswith("VAG_") and sheet.title == vag_sheet_name_hint:
+                elif is_vag_sheet and value_str_stripped.startswith("VAG_"):
                     cleaned_vag = value_str_stripped.replace(" ", "").replace('\u00A0', '')
                     if cleaned_vag:
-                        parsed_data["VAGs"].add(cleaned_vag)
-                        logger.debug(f"Parser found VAG: {cleaned_vag} from {cell.coordinate}")
+                        vag_names.add(cleaned_vag)
+                        if debug_logging_enabled:
+                            logger.debug(f"Parser found VAG: {cleaned_vag} from {cell.coordinate}")
                 
     logger.info("Built-in parser finished initial data extraction from source workbook.")
 
@@ -213,32 +238,37 @@ def parse_source_excel_to_standardized_workbook(
         try: output_workbook.remove(output_workbook.active)
         except Exception as e_rm_sheet: logger.warning(f"Could not remove default sheet: {e_rm_sheet}")
 
+    # Output sheets are filled with sheet.append(), which writes each row in one call below the
+    # header instead of a sheet.cell() lookup per value. The workbook stays a regular (not
+    # write-only) one because the caller reads these sheets back and adds comparison sheets.
     bold_font = Font(bold=True)
     if parsed_data["VQs"]:
         vq_sheet = output_workbook.create_sheet("VQs")
         vq_sheet.cell(row=1, column=1, value="VQ Name").font = bold_font
-        for i, vq_name in enumerate(sorted(list(parsed_data["VQs"])), start=2): vq_sheet.cell(row=i, column=1, value=vq_name)
+        for vq_name in sorted(parsed_data["VQs"]): vq_sheet.append((vq_name,))
         logger.info(f"Created 'VQs' output sheet with {len(parsed_data['VQs'])} items.")
     if parsed_data["Skills"]:
         skill_sheet = output_workbook.create_sheet("Skills")
         skill_sheet.cell(row=1, column=1, value="Skill Name").font = bold_font
-        for i, skill_name in enumerate(sorted(list(parsed_data["Skills"])), start=2): skill_sheet.cell(row=i, column=1, value=skill_name)
+        for skill_name in sorted(parsed_data["Skills"]): skill_sheet.append((skill_name,))
         logger.info(f"Created 'Skills' output sheet with {len(parsed_data['Skills'])} items.")
     if parsed_data["VAGs"]:
         vag_sheet = output_workbook.create_sheet("VAGs_Output")
         vag_sheet.cell(row=1, column=1, value="VAG Name").font = bold_font
-        for i, vag_name in enumerate(sorted(list(parsed_data["VAGs"])), start=2): vag_sheet.cell(row=i, column=1, value=vag_name)
+        for vag_name in sorted(parsed_data["VAGs"]): vag_sheet.append((vag_name,))
         logger.info(f"Created 'VAGs' sheet with {len(parsed_data['VAGs'])} items.")
     if parsed_data["Skill_Expressions"]:
         se_sheet = output_workbook.create_sheet("Skill_Expressions_Output")
         se_headers = ["Original Expression", "Ideal Expression", "Concatenated Key", "Extracted_Skills_List_String"]
         for col_idx, header in enumerate(se_headers, start=1): se_sheet.cell(row=1, column=col_idx, value=header).font = bold_font
         sorted_skill_expressions = sorted(parsed_data["Skill_Expressions"], key=lambda x: x.get("Concatenated Key", ""))
-        for row_idx, se_data in enumerate(sorted_skill_expressions, start=2):
-            se_sheet.cell(row=row_idx, column=1, value=se_data.get("Original Expression"))
-            se_sheet.cell(row=row_idx, column=2, value=se_data.get("Ideal Expression"))
-            se_sheet.cell(row=row_idx, column=3, value=se_data.get("Concatenated Key"))
-            se_sheet.cell(row=row_idx, column=4, value=se_data.get("Extracted_Skills_List_String"))
+        for se_data in sorted_skill_expressions:
+            se_sheet.append((
+                se_data.get("Original Expression"),
+                se_data.get("Ideal Expression"),
+                se_data.get("Concatenated Key"),
+                se_data.get("Extracted_Skills_List_String")
+            ))
         logger.info(f"Created 'Skill_Expressions' sheet with {len(parsed_data['Skill_Expressions'])} items.")
 
     logger.info("Built-in parser finished creating standardized output workbook object.")
@@ -259,7 +289,7 @@ if __name__ == '__main__': # pragma: no cover
     sheet2['A1'] = "VAG_Tier1_Support"; sheet2['A2'] = "VAG_Sales_VIP"; sheet2['A2'].font = Font(strike=True)
     wb.save(test_wb_path)
     logger.info(f"Created dummy test workbook: {test_wb_path}")
-    loaded_test_wb = openpyxl.load_workbook(test_wb_path, data_only=False, read_only=False) # Need styles for strike
+    loaded_test_wb = openpyxl.load_workbook(test_wb_path, data_only=False, read_only=True) # Read-only cells still carry styles for strike
     
     # Test with the new parse_source_excel_to_standardized_workbook which uses internal constants
     processed_wb = parse_source_excel_to_standardized_workbook(loaded_test_wb) # No config_hints needed
@@ -267,7 +297,7 @@ if __name__ == '__main__': # pragma: no cover
     processed_output_path = "test_source_excel_PARSED.xlsx"
     processed_wb.save(processed_output_path)
     logger.info(f"Saved parsed output to: {processed_output_path}")
-    verify_wb = openpyxl.load_workbook(processed_output_path)
+    verify_wb = openpyxl.load_workbook(processed_output_path, read_only=True) # Only read back for printing
     print("\nGenerated Sheets:");
     for sheetname in verify_wb.sheetnames:
         print(f"- {sheetname}"); ws = verify_wb[sheetname]
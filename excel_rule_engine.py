@@ -32,6 +32,12 @@ except ImportError:
 
 logger = logging.getLogger(__name__) # Use module-specific logger
 
+# Placeholders like {FieldName} or {_primary_} in constructFields format strings (compiled once)
+CONSTRUCT_FIELD_PLACEHOLDER_PATTERN = re.compile(r'{([^}]+)}')
+# searchInLocations entries: a bare column letter (e.g. "D") or a cell address (e.g. "D1")
+COLUMN_LETTER_LOCATION_PATTERN = re.compile(r'[A-Z]+', re.IGNORECASE)
+CELL_ADDRESS_LOCATION_PATTERN = re.compile(r'[A-Z]+[1-9][0-9]*', re.IGNORECASE)
+
 class ExcelRuleEngine:
     """
     Parses an Excel workbook based on a provided rule template (JSON).
@@ -169,6 +175,12 @@ class ExcelRuleEngine:
                     raise ValueError(f"Invalid 'sourceValueFrom' in 'extractSubEntities' for rule '{rule_name_for_error}'.")
                 if "replaceRules" in sub_entity_rule and not isinstance(sub_entity_rule["replaceRules"], list):
                     raise ValueError(f"'replaceRules' in 'extractSubEntities' for rule '{rule_name_for_error}' must be a list.")
+                # Pre-compile the sub-entity regex; it is applied to every cell the rule matches.
+                # An invalid pattern is left uncompiled so extraction reports it as before.
+                try:
+                    sub_entity_rule['_compiled_regex_processed'] = re.compile(sub_entity_rule["regex"])
+                except (re.error, TypeError):
+                    pass
             if "constructFields" in rule:
                 if not isinstance(rule["constructFields"], list): raise ValueError(f"'constructFields' for rule '{rule_name_for_error}' must be a list.")
                 for con_field_idx, con_field_rule in enumerate(rule["constructFields"]):
@@ -214,12 +226,12 @@ class ExcelRuleEngine:
         found_column_idx = None
         for loc in search_in_locations:
             try:
-                if re.fullmatch(r'[A-Z]+', loc, re.IGNORECASE):
+                if COLUMN_LETTER_LOCATION_PATTERN.fullmatch(loc):
                     col_idx_from_letter = openpyxl_cell_utils.column_index_from_string(loc)
                     if col_idx_from_letter <= sheet.max_column:
                         header_cell_value = sheet.cell(row=1, column=col_idx_from_letter).value
                         if header_cell_value and search_header_name in str(header_cell_value): found_column_idx = col_idx_from_letter; break
-                elif re.fullmatch(r'[A-Z]+[1-9][0-9]*', loc, re.IGNORECASE):
+                elif CELL_ADDRESS_LOCATION_PATTERN.fullmatch(loc):
                     col_str, row_str = openpyxl_cell_utils.coordinate_to_tuple(loc)
                     header_row_idx, header_col_idx = int(row_str), openpyxl_cell_utils.column_index_from_string(col_str)
                     if header_row_idx <= sheet.max_row and header_col_idx <= sheet.max_column:
@@ -233,14 +245,22 @@ class ExcelRuleEngine:
 
     def _fetch_additional_column_data_from_row(
         self, current_row_idx: int, sheet: openpyxl.worksheet.worksheet.Worksheet,
-        found_column_idx: int, replace_rules: List[Dict[str, str]], value_from_row_offset: int = 0
+        found_column_idx: int, replace_rules: List[Dict[str, str]], value_from_row_offset: int = 0,
+        sheet_bounds: Optional[Tuple[int, int]] = None, current_row_cells: Optional[Tuple[Any, ...]] = None
     ) -> Optional[str]:
-        """ Fetches and cleans data from a specific cell, potentially offset from the current row. """
-        # (No changes from previous version of this method)
+        """
+        Fetches and cleans data from a specific cell, potentially offset from the current row.
+        Callers iterating a sheet can pass its precomputed (max_row, max_column) as sheet_bounds,
+        and the current row's cells so a zero-offset value is read without another sheet lookup.
+        """
         target_row_idx = current_row_idx + value_from_row_offset
-        if not (1 <= target_row_idx <= sheet.max_row): logger.warning(f"Target row {target_row_idx} out of bounds for sheet '{sheet.title}'."); return None
-        if found_column_idx > sheet.max_column: logger.warning(f"Target column {found_column_idx} exceeds max column {sheet.max_column} for sheet '{sheet.title}'."); return None
-        additional_cell_value = sheet.cell(row=target_row_idx, column=found_column_idx).value
+        max_row, max_column = sheet_bounds if sheet_bounds else (sheet.max_row, sheet.max_column)
+        if not (1 <= target_row_idx <= max_row): logger.warning(f"Target row {target_row_idx} out of bounds for sheet '{sheet.title}'."); return None
+        if found_column_idx > max_column: logger.warning(f"Target column {found_column_idx} exceeds max column {max_column} for sheet '{sheet.title}'."); return None
+        if current_row_cells is not None and value_from_row_offset == 0 and found_column_idx <= len(current_row_cells):
+            additional_cell_value = current_row_cells[found_column_idx - 1].value # Same row, already loaded
+        else:
+            additional_cell_value = sheet.cell(row=target_row_idx, column=found_column_idx).value
         if additional_cell_value is not None:
             value_str = str(additional_cell_value).strip()
             if replace_rules: value_str = self._apply_replace_rules(value_str, replace_rules)
@@ -260,7 +280,7 @@ class ExcelRuleEngine:
         if not regex_pattern: logger.warning("Missing 'regex' in 'extractSubEntities' rule."); return []
         extracted_values = []
         try:
-            compiled_re = re.compile(regex_pattern)
+            compiled_re = sub_entity_rule.get('_compiled_regex_processed') or re.compile(regex_pattern)
             matches = compiled_re.findall(source_text)
             for match_value in matches:
                 value_to_clean = match_value[0] if isinstance(match_value, tuple) and match_value else match_value
@@ -277,7 +297,6 @@ class ExcelRuleEngine:
         ) -> Optional[str]:
         """ Constructs a new field value based on a format string and existing entity data. """
         # (No changes from previous version of this method)
-        placeholder_pattern = re.compile(r'{([^}]+)}')
         def replace_match(match):
             field_name_to_lookup = match.group(1).strip()
             if field_name_to_lookup == "_primary_": return str(current_entity_data.get(primary_key_name_for_this_rule, ""))
@@ -287,7 +306,7 @@ class ExcelRuleEngine:
                 elif on_missing_source == "error": logger.error(f"Missing source field '{field_name_to_lookup}' for constructField (onMissingSource=error)."); raise KeyError(f"Missing source field '{field_name_to_lookup}'")
                 elif on_missing_source == "skip_field": logger.debug(f"Missing source field '{field_name_to_lookup}' for constructField, will skip field."); raise ValueError("_SKIP_CONSTRUCT_FIELD_")
                 return match.group(0)
-        try: return placeholder_pattern.sub(replace_match, format_string)
+        try: return CONSTRUCT_FIELD_PLACEHOLDER_PATTERN.sub(replace_match, format_string)
         except ValueError as e:
             if str(e) == "_SKIP_CONSTRUCT_FIELD_": return None
             raise
@@ -316,6 +335,9 @@ class ExcelRuleEngine:
             if rule.get("enabled", True):
                 parsed_entities[rule["name"]] = []
 
+        # Checked once so per-match debug messages aren't formatted when debug logging is off
+        debug_logging_enabled = logger.isEnabledFor(logging.DEBUG)
+
         # --- PASS 1: Process rules that identify entities directly from Excel cells ---
         logger.info("Rule Engine - PASS 1: Processing direct Excel cell identifiers...")
         for sheet in workbook.worksheets:
@@ -325,27 +347,39 @@ class ExcelRuleEngine:
                 if not is_explicitly_included:
                     logger.info(f"Skipping sheet (globally): {sheet.title}")
                     continue
-            logger.info(f"PASS 1 - Processing sheet: {sheet.title} (Max Row: {sheet.max_row}, Max Col: {sheet.max_column})")
-            if sheet.title not in sheet_header_location_cache:
-                sheet_header_location_cache[sheet.title] = {}
-
-            for row_idx in range(1, sheet.max_row + 1):
-                for col_idx in range(1, sheet.max_column + 1):
-                    cell_coordinate_tuple = (sheet.title, row_idx, col_idx)
+            # Read the bounds once; on a regular worksheet each max_row/max_column access scans every cell
+            sheet_max_row, sheet_max_column = sheet.max_row, sheet.max_column
+            sheet_title = sheet.title
+            # Rules that may claim cells on this sheet, filtered once per sheet rather than once per cell
+            sheet_pass1_rules = [
+                rule for rule in self.rules
+                if rule.get("enabled", True) and "sourceFromField" not in rule
+                and (rule.get("sheets") is None or sheet_title in rule["sheets"])
+            ]
+            logger.info(f"PASS 1 - Processing sheet: {sheet.title} (Max Row: {sheet_max_row}, Max Col: {sheet_max_column})")
+            if sheet_title not in sheet_header_location_cache:
+                sheet_header_location_cache[sheet_title] = {}
+            if not sheet_pass1_rules:
+                logger.debug(f"PASS 1 - No direct-identifier rules apply to sheet: {sheet_title}")
+                continue
+            sheet_header_cache = sheet_header_location_cache[sheet_title]
+
+            # iter_rows yields each row's cells together instead of one sheet.cell() lookup per coordinate
+            sheet_rows = sheet.iter_rows(min_row=1, max_row=sheet_max_row, min_col=1, max_col=sheet_max_column)
+            for row_idx, row_cells in enumerate(sheet_rows, start=1):
+                for col_idx, cell in enumerate(row_cells, start=1):
+                    cell_coordinate_tuple = (sheet_title, row_idx, col_idx)
                     if cell_coordinate_tuple in claimed_primary_cells: continue
-                    cell = sheet.cell(row=row_idx, column=col_idx)
-                    if cell.value is None or str(cell.value).strip() == "": continue
-                    cell_value_str = str(cell.value).strip()
-
-                    for rule in self.rules:
-                        if not rule.get("enabled", True) or "sourceFromField" in rule: continue
-                        rule_sheets_filter = rule.get("sheets")
-                        if rule_sheets_filter is not None and sheet.title not in rule_sheets_filter: continue
+                    if cell.value is None: continue
+                    cell_value_str = str(cell.value).strip() # Converted and stripped once per cell
+                    if cell_value_str == "": continue
 
+                    for rule in sheet_pass1_rules:
                         # --- MODIFICATION: Use imported match_identifier_logic ---
                         if match_identifier_logic(cell_value_str, rule["identifier"]):
                         # --- END MODIFICATION ---
-                            logger.debug(f"PASS 1 MATCH: Rule '{rule['name']}', Cell {cell.coordinate}")
+                            if debug_logging_enabled:
+                                logger.debug(f"PASS 1 MATCH: Rule '{rule['name']}', Cell {cell.coordinate}")
                             claimed_primary_cells.add(cell_coordinate_tuple)
                             primary_value = cell_value_str
                             rule_check_strike = rule["identifier"].get("checkForStrikethrough", self.global_default_check_for_strikethrough)
@@ -355,16 +389,19 @@ class ExcelRuleEngine:
                             primary_key_name = rule.get("primaryFieldKey", rule["name"])
                             entity_data[primary_key_name] = primary_value
                             entity_data["strike"] = primary_strike_status
-                            entity_data["_source_sheet_title_"] = sheet.title
+                            entity_data["_source_sheet_title_"] = sheet_title
                             entity_data["_source_cell_coordinate_"] = cell.coordinate
                             entity_data["_rule_primary_field_key_"] = primary_key_name
 
                             if "fetchAdditionalColumn" in rule:
                                 add_col_config = rule["fetchAdditionalColumn"]
-                                header_col_idx_found = self._find_additional_column_header_once_per_sheet(sheet, add_col_config, sheet_header_location_cache[sheet.title])
+                                header_col_idx_found = self._find_additional_column_header_once_per_sheet(sheet, add_col_config, sheet_header_cache)
                                 if header_col_idx_found:
                                     offset = add_col_config.get("valueFromRowOffset", 0)
-                                    additional_value = self._fetch_additional_column_data_from_row(row_idx, sheet, header_col_idx_found, add_col_config.get("replaceRules", []), offset)
+                                    additional_value = self._fetch_additional_column_data_from_row(
+                                        row_idx, sheet, header_col_idx_found, add_col_config.get("replaceRules", []), offset,
+                                        sheet_bounds=(sheet_max_row, sheet_max_column), current_row_cells=row_cells
+                                    )
                                     if additional_value is not None:
                                         target_key = add_col_config.get("targetKeyName")
                                         if target_key: entity_data[target_key] = additional_value
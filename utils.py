@@ -5,6 +5,7 @@ Includes Excel styling, placeholder replacement, ID generation,
 reading processed comparison data from Excel, and identifier matching.
 """
 
+import functools
 import logging
 import re
 import os # For path manipulation
@@ -12,7 +13,7 @@ import openpyxl
 from openpyxl.styles import Font, PatternFill # Ensure Font/PatternFill are imported if used
 from openpyxl.utils import cell as openpyxl_cell_utils
 from openpyxl.utils.exceptions import InvalidFileException # For specific exception handling
-from typing import Optional, Any, Dict, Tuple, Set, List
+from typing import Optional, Any, Dict, Tuple, Set, List, Pattern
 from flask import current_app # For accessing app.config in read_comparison_data
 
 logger = logging.getLogger(__name__) # Use module-specific logger
@@ -72,6 +73,10 @@ def copy_cell_style(source_cell: openpyxl.cell.Cell, target_cell: openpyxl.cell.
         target_cell.number_format = 'General'
 
 
+# Skill names (alphanumeric or underscore) followed immediately by '>' and a level, e.g. 'SkillName>5'
+SKILL_NAME_PATTERN = re.compile(r'\b([a-zA-Z0-9_]+)(?=>\d+)')
+
+
 def extract_skills(expression: str) -> list[str]:
     """
     Extracts potential skill names (alphanumeric + underscore) from a skill
@@ -83,13 +88,28 @@ def extract_skills(expression: str) -> list[str]:
     Returns:
         A list of extracted skill names.
     """
-    # Regex finds words (alphanumeric or underscore) followed immediately by '>' and one or more digits
-    # The capturing group is the skill name itself.
-    skills = re.findall(r'\b([a-zA-Z0-9_]+)(?=>\d+)', expression)
+    # The capturing group of SKILL_NAME_PATTERN is the skill name itself.
+    skills = SKILL_NAME_PATTERN.findall(expression)
     # logger.debug(f"Extracted skills {skills} from expression '{expression}'") # Logging can be done by caller
     return skills
 
 
+def normalize_skill_expression(expression: str) -> str:
+    """
+    Normalizes a skill expression (or ideal expression) for use in comparison keys:
+    removes regular and non-breaking spaces, then pads '|' and '&' with single spaces.
+    Shared by the built-in Excel parser and API processing so their keys line up.
+
+    Args:
+        expression: The raw expression string.
+
+    Returns:
+        The normalized expression string.
+    """
+    # Chained str.replace is faster here than str.translate or a regex (multi-character replacements)
+    return expression.replace(" ", "").replace('\u00A0', '').replace("|", " | ").replace("&", " & ")
+
+
 # --- ID Generation Helper ---
 class IdGenerator:
     """
@@ -127,6 +147,11 @@ class IdGenerator:
         return next_id
 
 # --- Template Placeholder Replacement ---
+# Placeholders like {row.ColumnName} or {func.next_id}; captures the type and the name.
+# Compiled once here because replace_placeholders recurses through every template string of every row.
+PLACEHOLDER_PATTERN = re.compile(r'{(\w+)\.([^}]+)}')
+
+
 def replace_placeholders(template_data: Any, row_data: dict, current_row_next_id: Optional[int] = None) -> Any:
     """
     Recursively traverses a template structure (dict, list, or string)
@@ -145,7 +170,6 @@ def replace_placeholders(template_data: Any, row_data: dict, current_row_next_id
     Returns:
         The template structure with placeholders replaced.
     """
-    placeholder_pattern = re.compile(r'{(\w+)\.([^}]+)}')
 
     def perform_replace(text: str) -> str:
         """Performs replacements on a single string."""
@@ -182,7 +206,7 @@ def replace_placeholders(template_data: Any, row_data: dict, current_row_next_id
             else:
                  logger.warning(f"Unknown placeholder type in template: {match.group(0)}")
                  return match.group(0)
-        return placeholder_pattern.sub(replace_match, text)
+        return PLACEHOLDER_PATTERN.sub(replace_match, text)
 
     if isinstance(template_data, str):
         return perform_replace(template_data)
@@ -201,6 +225,17 @@ def replace_placeholders(template_data: Any, row_data: dict, current_row_next_id
 
 
 # --- Identifier Matching Logic (Shared) ---
+@functools.lru_cache(maxsize=256)
+def _compile_identifier_regex(pattern: str) -> Pattern:
+    """
+    Compiles a regex identifier pattern once and reuses it on later calls.
+    Used for raw (not pre-processed) rules, e.g. those passed in by api_fetching,
+    which would otherwise be compiled again for every API item checked.
+    Invalid patterns raise re.error and are not cached.
+    """
+    return re.compile(pattern)
+
+
 def match_identifier_logic(value_to_check_str: str, identifier_rule: Dict[str, Any]) -> bool:
     """
     Checks if a string value matches a given identifier rule.
@@ -226,10 +261,10 @@ def match_identifier_logic(value_to_check_str: str, identifier_rule: Dict[str, A
     if id_type == "regex":
         value_from_rule = identifier_rule.get('_value_original', identifier_rule.get("value", ""))
         compiled_regex = identifier_rule.get('_compiled_regex_processed')
-        # If regex is not pre-compiled (e.g. direct call), compile it now
+        # If regex is not pre-compiled (e.g. direct call), compile it now (cached per pattern)
         if not compiled_regex and value_from_rule:
             try:
-                compiled_regex = re.compile(value_from_rule)
+                compiled_regex = _compile_identifier_regex(value_from_rule)
             except re.error as e:
                 logger.warning(f"Invalid regex '{value_from_rule}' in identifier rule during match: {e}")
                 return False
@@ -332,7 +367,7 @@ def read_comparison_data(filename: str) -> bool:
 
 
         # Find all sheets ending with the comparison suffix
-        comparison_sheet_names_found = sorted([s for s in workbook.sheetnames if s.endswith(COMPARISON_SUFFIX)])
+        comparison_sheet_names_found = sorted(s for s in workbook.sheetnames if s.endswith(COMPARISON_SUFFIX))
         logger.info(f"Found comparison sheets: {comparison_sheet_names_found}")
 
         # If no comparison sheets found, still return True but with empty data